@@ -1,8 +1,10 @@
 """Written analysis generation for flagged courses."""
 
+import functools
+import re
+
 import pandas as pd
 import numpy as np
-from patterns import _build_term_order
 
 
 # Maps pattern keywords found in reason strings to recommended actions.
@@ -15,51 +17,171 @@ _PATTERN_ACTIONS = {
 }
 
 
-def _reason_tags(reasons: list[str]) -> set[str]:
-    """Return a set of pattern tags present in a course's reason strings."""
-    tags = set()
-    for r in reasons:
-        if "in a row" in r:
-            tags.add("persistent")
-        if "rising" in r:
-            tags.add("trend")
-        if "spike" in r:
-            tags.add("spike")
-        if "Multiple issues" in r:
-            tags.add("co_occurring")
-    return tags
-
-
-def _pick_action(tags: set[str]) -> str:
-    """Choose the most urgent action given a set of pattern tags."""
-    # Priority order: co-occurring > persistent > trend > spike > fallback
-    priority = ["co_occurring", "persistent", "trend", "spike"]
-    for tag in priority:
-        if tag in tags:
-            return _PATTERN_ACTIONS[tag]
-    return "Review course data and discuss with department"
-
-
-def _make_headline(row: pd.Series) -> str:
-    """Generate a one-sentence headline from a flagged course row."""
-    tags = _reason_tags(row["reasons"])
-    rate = f"{row['latest_dfw_rate']:.0%}"
-    term = row["latest_term"]
-
-    if "persistent" in tags:
-        # Extract streak length from reason text
-        for r in row["reasons"]:
-            if "in a row" in r:
-                parts = r.split()
-                for i, p in enumerate(parts):
-                    if p == "terms":
-                        return f"DFW rate at {rate} for {parts[i-1]} consecutive terms"
+# Below this many flagged courses, the course-term frame is narrowed to
+# those courses before aggregating rather than grouped whole.
+_SMALL_FLAGGED = 8
+
+# Substrings in reason strings that identify each pattern tag.
+_TAG_KEYWORDS = {
+    "persistent": "in a row",
+    "trend": "rising",
+    "spike": "spike",
+    "co_occurring": "Multiple issues",
+}
+
+
+# Brief wording of each pattern tag for summary lists.
+_SHORT_REASONS = {
+    "persistent": "persistent high DFW",
+    "trend": "worsening trend",
+    "spike": "recent spike",
+    "co_occurring": "multiple co-occurring issues",
+}
+
+# Bit assigned to each pattern tag; a course's tags combine into one int mask.
+_TAG_BITS = {"co_occurring": 8, "persistent": 4, "trend": 2, "spike": 1}
+
+_FALLBACK_ACTION = "Review course data and discuss with department"
+
+
+def _first_tag_by_mask(priority: list[str]) -> list[str | None]:
+    """Table of the highest-priority tag present in each possible tag mask."""
+    return [
+        next((t for t in priority if mask & _TAG_BITS[t]), None)
+        for mask in range(16)
+    ]
+
+
+# Action for every tag mask. Priority: co-occurring > persistent > trend > spike
+_ACTION_BY_MASK = [
+    _PATTERN_ACTIONS[t] if t else _FALLBACK_ACTION
+    for t in _first_tag_by_mask(["co_occurring", "persistent", "trend", "spike"])
+]
+
+# Brief reason for every tag mask, in keyword-table priority order.
+_SHORT_REASON_BY_MASK = [
+    _SHORT_REASONS[t] if t else None for t in _first_tag_by_mask(list(_TAG_KEYWORDS))
+]
+
+
+def _reason_flags(reasons: pd.Series) -> pd.DataFrame:
+    """Flag every individual reason string with the pattern tags it mentions.
+
+    Returns a boolean DataFrame with one row per reason (indexed by the
+    flagged course it came from) and one column per pattern tag.
+    """
+    flat = reasons.explode()
+    return pd.DataFrame(
+        {
+            tag: flat.str.contains(keyword, regex=False, na=False)
+            for tag, keyword in _TAG_KEYWORDS.items()
+        },
+        index=flat.index,
+    )
+
+
+_STREAK_PATTERN = re.compile(r"(\d+)\s+terms")
+
+
+@functools.lru_cache(maxsize=1024)
+def _summarize_reasons(reasons: tuple[str, ...]) -> tuple[int, str | None]:
+    """Classify one course's reasons into a ``_TAG_BITS`` mask and streak.
+
+    The streak is the term count quoted in the first persistent-DFW reason,
+    or None. Cached on the reasons tuple, so courses with identical reasons
+    are only scanned once.
+    """
+    tag_mask = 0
+    streak = None
+    for reason in reasons:
+        for tag, keyword in _TAG_KEYWORDS.items():
+            if keyword in reason:
+                tag_mask |= _TAG_BITS[tag]
+        if streak is None and _TAG_KEYWORDS["persistent"] in reason:
+            match = _STREAK_PATTERN.search(reason)
+            if match:
+                streak = match.group(1)
+    return tag_mask, streak
+
+
+def _restrict_to_flagged(df: pd.DataFrame, flagged_df: pd.DataFrame) -> pd.DataFrame:
+    """Cheaply narrow df to rows that may belong to a flagged course.
+
+    Matches subjects and catalog numbers independently, so the result is a
+    superset of the flagged courses' rows; exact lookups happen afterwards.
+    """
+    mask = df["Subject"].isin(flagged_df["Subject"].unique()) & df[
+        "Catalog Number"
+    ].isin(flagged_df["Catalog Number"].unique())
+    return df[mask]
+
+
+def _section_stats(
+    section_df: pd.DataFrame, flagged_df: pd.DataFrame
+) -> pd.DataFrame:
+    """Summarize section-level DFW rates for each flagged course's latest term.
+
+    Returns count, sample std, min and max of the non-missing rates per
+    (Subject, Catalog Number, Term Description).
+    """
+    keys = ["Subject", "Catalog Number", "Term Description"]
+    # Only the flagged courses' latest terms are ever looked up, so join
+    # those keys in first and aggregate just the matching sections.
+    flagged_keys = (
+        flagged_df[["Subject", "Catalog Number", "latest_term"]]
+        .rename(columns={"latest_term": "Term Description"})
+        .drop_duplicates()
+    )
+    merged = section_df[keys + ["dfw_rate"]].merge(flagged_keys, on=keys)
+    return merged.groupby(keys, observed=True)["dfw_rate"].agg(
+        std="std", lo="min", hi="max", n="count"
+    )
+
+
+def _section_spread(
+    section_stats: pd.DataFrame, subject, catalog, term
+) -> tuple[float, float] | None:
+    """Return the (low, high) section DFW rates if sections vary notably."""
+    try:
+        stats = section_stats.loc[(subject, catalog, term)]
+    except KeyError:
+        return None
+    if stats["n"] > 1 and stats["std"] > 0.05:
+        return stats["lo"], stats["hi"]
+    return None
+
+
+def _course_history(
+    course_term_df: pd.DataFrame, flagged_df: pd.DataFrame
+) -> pd.DataFrame:
+    """Mean DFW rate and number of terms offered per course."""
+    if len(flagged_df) < _SMALL_FLAGGED:
+        course_term_df = _restrict_to_flagged(course_term_df, flagged_df)
+    return course_term_df.groupby(["Subject", "Catalog Number"], observed=True)[
+        "dfw_rate"
+    ].agg(mean="mean", n_terms="size")
+
+
+def _pick_action(tag_mask: int) -> str:
+    """Choose the most urgent action given a course's tag mask."""
+    return _ACTION_BY_MASK[tag_mask]
+
+
+def _make_headline(
+    tag_mask: int, streak: str | None, dfw_rate: float, term: str
+) -> str:
+    """Generate a one-sentence headline for a flagged course."""
+    rate = f"{dfw_rate:.0%}"
+
+    if tag_mask & _TAG_BITS["persistent"]:
+        if streak is not None:
+            return f"DFW rate at {rate} for {streak} consecutive terms"
         return f"Persistently high DFW rate at {rate}"
-    if "trend" in tags:
+    if tag_mask & _TAG_BITS["trend"]:
         return f"DFW rate rising, now at {rate} in {term}"
-    if "spike" in tags:
+    if tag_mask & _TAG_BITS["spike"]:
         return f"DFW rate spiked to {rate} in {term}"
-    if "co_occurring" in tags:
+    if tag_mask & _TAG_BITS["co_occurring"]:
         return f"Multiple issues co-occurring at {rate} DFW in {term}"
     return f"DFW rate at {rate} in {term}"
 
@@ -69,52 +191,59 @@ def classify_severity(
     course_term_df: pd.DataFrame,
     section_df: pd.DataFrame,
     settings: dict,
+    section_stats: pd.DataFrame | None = None,
 ) -> dict:
     """Classify flagged courses into severity tiers.
 
     Returns a dict with keys 'immediate', 'moderate', 'watch', each containing
     a list of course dicts with severity info, headline, and recommended action.
+    ``section_stats`` may be passed in when the caller has already computed
+    it with ``_section_stats``.
     """
     if flagged_df.empty:
         return {"immediate": [], "moderate": [], "watch": []}
 
+    if section_stats is None:
+        section_stats = _section_stats(section_df, flagged_df)
+
     threshold = settings["dfw_threshold"]
     results = {"immediate": [], "moderate": [], "watch": []}
 
-    for _, row in flagged_df.iterrows():
-        tags = _reason_tags(row["reasons"])
-        n_reasons = len(row["reasons"])
-        dfw = row["latest_dfw_rate"]
+    for subject, catalog, dfw, term, reasons in zip(
+        flagged_df["Subject"].to_numpy(),
+        flagged_df["Catalog Number"].to_numpy(),
+        flagged_df["latest_dfw_rate"].to_numpy(),
+        flagged_df["latest_term"].to_numpy(),
+        flagged_df["reasons"].to_list(),
+    ):
+        tag_mask, streak = _summarize_reasons(tuple(reasons))
+        n_reasons = len(reasons)
 
         # Check for section variation
-        secs = section_df[
-            (section_df["Subject"] == row["Subject"])
-            & (section_df["Catalog Number"] == row["Catalog Number"])
-            & (section_df["Term Description"] == row["latest_term"])
-        ]
-        has_section_var = False
-        if len(secs) > 1:
-            sec_rates = secs["dfw_rate"].dropna()
-            if len(sec_rates) > 1 and sec_rates.std() > 0.05:
-                has_section_var = True
-                tags.add("section_variation")
+        has_section_var = _section_spread(
+            section_stats, subject, catalog, term
+        ) is not None
 
         # Classify severity
-        if n_reasons >= 2 or "persistent" in tags or dfw > threshold * 1.5:
+        if (
+            n_reasons >= 2
+            or tag_mask & _TAG_BITS["persistent"]
+            or dfw > threshold * 1.5
+        ):
             severity = "immediate"
-        elif "trend" in tags or "spike" in tags:
+        elif tag_mask & (_TAG_BITS["trend"] | _TAG_BITS["spike"]):
             severity = "moderate"
         else:
             severity = "watch"
 
         entry = {
-            "course": f"{row['Subject']} {row['Catalog Number']}",
+            "course": f"{subject} {catalog}",
             "severity": severity,
             "dfw_rate": dfw,
-            "term": row["latest_term"],
-            "headline": _make_headline(row),
-            "action": _pick_action(tags),
-            "reasons": row["reasons"],
+            "term": term,
+            "headline": _make_headline(tag_mask, streak, dfw, term),
+            "action": _pick_action(tag_mask),
+            "reasons": reasons,
             "has_section_variation": has_section_var,
         }
         results[severity].append(entry)
@@ -127,10 +256,15 @@ def generate_analysis(
     course_term_df: pd.DataFrame,
     section_df: pd.DataFrame,
     settings: dict,
+    tiers: dict | None = None,
+    section_stats: pd.DataFrame | None = None,
 ) -> str:
     """Generate a written analysis of flagged courses with recommendations.
 
     Returns a markdown string with actions first, then summary, then detail.
+    ``tiers`` and ``section_stats`` may be passed in when the caller has
+    already run ``classify_severity`` and ``_section_stats`` on the same
+    inputs.
     """
     if flagged_df.empty:
         return (
@@ -140,12 +274,26 @@ def generate_analysis(
             "expanding the term/subject selection if you want a broader scan."
         )
 
-    tiers = classify_severity(flagged_df, course_term_df, section_df, settings)
+    if section_stats is None:
+        section_stats = _section_stats(section_df, flagged_df)
+    if tiers is None:
+        tiers = classify_severity(
+            flagged_df,
+            course_term_df,
+            section_df,
+            settings,
+            section_stats=section_stats,
+        )
 
     sections = []
     sections.append(_write_actions(tiers))
-    sections.append(_write_executive_summary(flagged_df, course_term_df, settings))
-    sections.append(_write_supporting_detail(flagged_df, course_term_df, section_df))
+    sections.append(
+        _write_executive_summary(
+            flagged_df, course_term_df, _reason_flags(flagged_df["reasons"])
+        )
+    )
+    history = _course_history(course_term_df, flagged_df)
+    sections.append(_write_supporting_detail(flagged_df, history, section_stats))
 
     return "\n\n---\n\n".join(s for s in sections if s)
 
@@ -181,7 +329,7 @@ def _write_actions(tiers: dict) -> str:
 def _write_executive_summary(
     flagged_df: pd.DataFrame,
     course_term_df: pd.DataFrame,
-    settings: dict,
+    reason_flags: pd.DataFrame,
 ) -> str:
     """High-level overview."""
     n_flagged = len(flagged_df)
@@ -189,14 +337,11 @@ def _write_executive_summary(
     pct = n_flagged / n_total * 100 if n_total > 0 else 0
 
     # Count by reason type
-    all_reasons = []
-    for reasons in flagged_df["reasons"]:
-        all_reasons.extend(reasons)
-
-    persistent_count = sum(1 for r in all_reasons if "in a row" in r)
-    trend_count = sum(1 for r in all_reasons if "rising" in r)
-    spike_count = sum(1 for r in all_reasons if "spike" in r)
-    multi_count = sum(1 for r in all_reasons if "Multiple issues" in r)
+    counts = reason_flags.sum()
+    persistent_count = int(counts["persistent"])
+    trend_count = int(counts["trend"])
+    spike_count = int(counts["spike"])
+    multi_count = int(counts["co_occurring"])
 
     lines = [
         "## Executive Summary",
@@ -229,81 +374,92 @@ def _write_executive_summary(
 
 def _write_supporting_detail(
     flagged_df: pd.DataFrame,
-    course_term_df: pd.DataFrame,
-    section_df: pd.DataFrame,
+    history: pd.DataFrame,
+    section_stats: pd.DataFrame,
 ) -> str:
     """Merged priority concerns and course details as supporting reference."""
-    lines = ["## Supporting Detail", ""]
-
-    scored = flagged_df.copy()
-    scored["n_reasons"] = scored["reasons"].apply(len)
-    scored = scored.sort_values(
-        ["n_reasons", "latest_dfw_rate"], ascending=[False, False]
-    )
-
-    for rank, (_, row) in enumerate(scored.iterrows(), 1):
-        course = f"{row['Subject']} {row['Catalog Number']}"
-        lines.append(f"### {rank}. {course}")
-        lines.append("")
-        lines.append(
-            f"- **Latest avg DFW rate:** {row['latest_dfw_rate']:.1%} "
-            f"({row['latest_term']})"
-        )
-        if not pd.isna(row.get("latest_num_sections")):
-            lines.append(
-                f"- **Sections:** {row['latest_num_sections']:.0f} "
-                f"(avg {row['latest_enrollments']:.0f} students per section)"
+    # Most reasons first, then highest DFW rate (missing rates last).
+    n_reasons = flagged_df["reasons"].str.len().to_numpy()
+    dfw_rates = flagged_df["latest_dfw_rate"].to_numpy(dtype=np.float64)
+    order = np.lexsort((-dfw_rates, -n_reasons))
+
+    # Enrollments are only shown next to a section count, so both optional
+    # columns fall back together.
+    if "latest_num_sections" in flagged_df:
+        num_sections = flagged_df["latest_num_sections"].to_numpy(dtype=np.float64)
+        enrollments = flagged_df["latest_enrollments"].to_numpy(dtype=np.float64)
+    else:
+        num_sections = enrollments = np.full(len(flagged_df), np.nan)
+    reasons_list = flagged_df["reasons"].to_numpy()
+
+    # Format the per-course numbers column-wise ("%.1f%%" of rate * 100 is
+    # exactly what f"{rate:.1%}" produces).
+    dfw_text = np.char.mod("%.1f%%", dfw_rates * 100)
+    has_sections = ~np.isnan(num_sections)
+    sections_text = np.char.mod("%.0f", num_sections)
+    enroll_text = np.char.mod("%.0f", enrollments)
+
+    blocks = []
+    for rank, (
+        subject, catalog, dfw_pct, term, reasons, show_sections, n_sec, n_enroll
+    ) in enumerate(
+        zip(
+            flagged_df["Subject"].to_numpy()[order],
+            flagged_df["Catalog Number"].to_numpy()[order],
+            dfw_text[order],
+            flagged_df["latest_term"].to_numpy()[order],
+            reasons_list[order],
+            has_sections[order],
+            sections_text[order],
+            enroll_text[order],
+        ),
+        1,
+    ):
+        sections_line = ""
+        if show_sections:
+            sections_line = (
+                f"- **Sections:** {n_sec} "
+                f"(avg {n_enroll} students per section)\n"
             )
 
-        ct = course_term_df[
-            (course_term_df["Subject"] == row["Subject"])
-            & (course_term_df["Catalog Number"] == row["Catalog Number"])
-        ]
-        if not ct.empty:
-            term_order = _build_term_order(ct["Term Description"].unique())
-            ct = ct.copy()
-            ct["_order"] = ct["Term Description"].map(term_order)
-            ct = ct.sort_values("_order")
-            historical_mean = ct["dfw_rate"].mean()
-            lines.append(
-                f"- **Historical avg DFW rate:** {historical_mean:.1%} "
-                f"(across {len(ct)} terms)"
+        history_line = ""
+        try:
+            hist = history.loc[(subject, catalog)]
+        except KeyError:
+            hist = None
+        if hist is not None:
+            history_line = (
+                f"- **Historical avg DFW rate:** {hist['mean']:.1%} "
+                f"(across {int(hist['n_terms'])} terms)\n"
             )
 
-        lines.append("- **Findings:**")
-        for reason in row["reasons"]:
-            lines.append(f"  - {reason}")
-
-        secs = section_df[
-            (section_df["Subject"] == row["Subject"])
-            & (section_df["Catalog Number"] == row["Catalog Number"])
-            & (section_df["Term Description"] == row["latest_term"])
-        ]
-        if len(secs) > 1:
-            sec_rates = secs["dfw_rate"].dropna()
-            if len(sec_rates) > 1 and sec_rates.std() > 0.05:
-                low = sec_rates.min()
-                high = sec_rates.max()
-                lines.append(
-                    f"- **Section variation:** DFW rates range from "
-                    f"{low:.1%} to {high:.1%} across sections, "
-                    f"suggesting the issue may be concentrated in "
-                    f"specific sections rather than course-wide."
-                )
+        variation_line = ""
+        spread = _section_spread(section_stats, subject, catalog, term)
+        if spread is not None:
+            low, high = spread
+            variation_line = (
+                f"- **Section variation:** DFW rates range from "
+                f"{low:.1%} to {high:.1%} across sections, "
+                f"suggesting the issue may be concentrated in "
+                f"specific sections rather than course-wide.\n"
+            )
 
-        lines.append("")
+        findings = "".join(f"  - {reason}\n" for reason in reasons)
+        blocks.append(
+            f"### {rank}. {subject} {catalog}\n"
+            f"\n"
+            f"- **Latest avg DFW rate:** {dfw_pct} ({term})\n"
+            f"{sections_line}"
+            f"{history_line}"
+            f"- **Findings:**\n"
+            f"{findings}"
+            f"{variation_line}"
+        )
 
-    return "\n".join(lines)
+    return "## Supporting Detail\n\n" + "\n".join(blocks)
 
 
 def _shorten_reason(reason: str) -> str:
     """Create a brief version of a reason for the summary list."""
-    if "in a row" in reason:
-        return "persistent high DFW"
-    if "rising" in reason:
-        return "worsening trend"
-    if "spike" in reason:
-        return "recent spike"
-    if "Multiple issues" in reason:
-        return "multiple co-occurring issues"
-    return reason
+    tag_mask, _ = _summarize_reasons((reason,))
+    return _SHORT_REASON_BY_MASK[tag_mask] or reason
@@ -4,13 +4,15 @@ A Streamlit app for analyzing multi-year, course-level student success outcomes
 from Section Attrition & Grade Report Excel files.
 """
 
+from io import BytesIO
+
 import streamlit as st
 import pandas as pd
 
 from data_loader import load_excel, clean_dataframe, build_course_term_averages
 from metrics import compute_metrics
 from patterns import detect_patterns, _build_term_order
-from analysis import generate_analysis, classify_severity
+from analysis import generate_analysis, classify_severity, _section_stats
 from auth import is_authenticated, is_admin, render_login_page, render_logout_button
 from ui_components import (
     _load_settings,
@@ -41,6 +43,30 @@ st.title("Panther Metrics")
 st.caption("Student Success Patterns Analyzer")
 
 
+# Streamlit reruns the whole script on every widget change; these wrappers
+# let reruns reuse results whose inputs (file bytes, frames, thresholds)
+# have not changed.
+@st.cache_data(show_spinner="Processing workbook...", max_entries=4)
+def _process(file_bytes: bytes):
+    """Load, clean and aggregate an uploaded workbook in one cached step.
+
+    Returns (section_df, course_term_df, info, rollup_count). The frames are
+    None when required columns are missing.
+    """
+    raw_df, info = load_excel(BytesIO(file_bytes))
+    if info["missing_required"]:
+        return None, None, info, 0
+
+    section_df, rollup_count, _ = clean_dataframe(raw_df)
+    # Compute section-level metrics, then build course-term averages
+    section_df = compute_metrics(section_df)
+    course_term_df = build_course_term_averages(section_df)
+    return section_df, course_term_df, info, rollup_count
+
+
+_detect_patterns = st.cache_data(show_spinner=False, max_entries=16)(detect_patterns)
+
+
 def _load_and_filter(settings):
     """Retrieve data from session state, apply filters, and detect patterns.
 
@@ -67,7 +93,7 @@ def _load_and_filter(settings):
     if filtered_ct.empty:
         return None
 
-    flagged = detect_patterns(
+    flagged = _detect_patterns(
         filtered_ct,
         dfw_threshold=settings["dfw_threshold"],
         drop_threshold=settings["drop_threshold"],
@@ -115,14 +141,16 @@ def main():
             st.info("Upload an Excel file to begin analysis.")
             render_methodology()
         else:
-            # Load and validate
+            # Load, validate, clean and aggregate
             try:
-                raw_df, info = load_excel(uploaded_file)
+                section_df, course_term_df, info, rollup_count = _process(
+                    uploaded_file.getvalue()
+                )
             except Exception as e:
                 st.error(f"Error reading Excel file: {e}")
-                raw_df = None
+                info = None
 
-            if raw_df is not None:
+            if info is not None:
                 # Validation summary
                 st.subheader("Upload Summary")
                 st.write(f"**Rows loaded:** {info['total_rows']}")
@@ -139,77 +167,32 @@ def main():
                         f"{', '.join(info['missing_optional'])}"
                     )
 
-                # Clean data
-                section_df, rollup_count, _ = clean_dataframe(raw_df)
                 st.write(f"**Rollup/total rows removed:** {rollup_count}")
                 st.write(f"**Individual section rows retained:** {len(section_df)}")
                 st.success("Data loaded successfully.")
 
-                # Compute section-level metrics, then build course-term averages
-                section_df = compute_metrics(section_df)
-                course_term_df = build_course_term_averages(section_df)
-
-                # ── Term and Subject selection via checkboxes ────────────
+                # ── Term and Subject selection ───────────────────────────
                 st.divider()
                 st.subheader("Select Terms")
 
+                unique_terms = section_df["Term Description"].unique()
+                term_order = _build_term_order(unique_terms)
                 all_terms = sorted(
-                    section_df["Term Description"].unique(),
-                    key=lambda t: _build_term_order(
-                        section_df["Term Description"].unique()
-                    ).get(t, 0),
+                    unique_terms, key=lambda t: term_order.get(t, 0)
+                )
+                selected_terms = st.multiselect(
+                    "Terms", all_terms, default=all_terms,
+                    label_visibility="collapsed",
                 )
-
-                for term in all_terms:
-                    if f"term_{term}" not in st.session_state:
-                        st.session_state[f"term_{term}"] = True
-
-                btn_col1, btn_col2, _ = st.columns([1, 1, 4])
-                with btn_col1:
-                    if st.button("Select all terms"):
-                        for term in all_terms:
-                            st.session_state[f"term_{term}"] = True
-                        st.rerun()
-                with btn_col2:
-                    if st.button("Deselect all terms"):
-                        for term in all_terms:
-                            st.session_state[f"term_{term}"] = False
-                        st.rerun()
-
-                term_cols = st.columns(4)
-                selected_terms = []
-                for i, term in enumerate(all_terms):
-                    with term_cols[i % 4]:
-                        if st.checkbox(term, key=f"term_{term}"):
-                            selected_terms.append(term)
 
                 st.divider()
                 st.subheader("Select Subjects")
 
                 all_subjects = sorted(section_df["Subject"].unique())
-
-                for subj in all_subjects:
-                    if f"subj_{subj}" not in st.session_state:
-                        st.session_state[f"subj_{subj}"] = True
-
-                btn_col3, btn_col4, _ = st.columns([1, 1, 4])
-                with btn_col3:
-                    if st.button("Select all subjects"):
-                        for subj in all_subjects:
-                            st.session_state[f"subj_{subj}"] = True
-                        st.rerun()
-                with btn_col4:
-                    if st.button("Deselect all subjects"):
-                        for subj in all_subjects:
-                            st.session_state[f"subj_{subj}"] = False
-                        st.rerun()
-
-                subj_cols = st.columns(4)
-                selected_subjects = []
-                for i, subj in enumerate(all_subjects):
-                    with subj_cols[i % 4]:
-                        if st.checkbox(subj, key=f"subj_{subj}"):
-                            selected_subjects.append(subj)
+                selected_subjects = st.multiselect(
+                    "Subjects", all_subjects, default=all_subjects,
+                    label_visibility="collapsed",
+                )
 
                 # Store in session state
                 st.session_state["section_df"] = section_df
@@ -293,8 +276,11 @@ def main():
                         "and data selections. No action needed."
                     )
                 else:
+                    # Shared by the tiers and the full report below
+                    section_stats = _section_stats(filtered_section, flagged)
                     tiers = classify_severity(
-                        flagged, filtered_ct, filtered_section, settings
+                        flagged, filtered_ct, filtered_section, settings,
+                        section_stats=section_stats,
                     )
 
                     # ── Action Dashboard metrics ──
@@ -342,7 +328,8 @@ def main():
                     # ── Full report in expander ──
                     st.divider()
                     report = generate_analysis(
-                        flagged, filtered_ct, filtered_section, settings
+                        flagged, filtered_ct, filtered_section, settings,
+                        tiers=tiers, section_stats=section_stats,
                     )
                     with st.expander("Full Analysis Report"):
                         st.markdown(report)
@@ -1,6 +1,7 @@
 """Authentication and role-based access control."""
 
 import hashlib
+import hmac
 
 import streamlit as st
 
@@ -26,7 +27,8 @@ USERS = {
 def authenticate(username: str, password: str) -> dict | None:
     """Validate credentials. Returns user info dict or None."""
     user = USERS.get(username)
-    if user and user["password_hash"] == _hash_password(password):
+    # Constant-time compare so response timing doesn't leak hash prefixes
+    if user and hmac.compare_digest(user["password_hash"], _hash_password(password)):
         return {"username": username, "role": user["role"], "display_name": user["display_name"]}
     return None
 
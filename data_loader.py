@@ -3,6 +3,14 @@
 import pandas as pd
 import numpy as np
 
+try:
+    import python_calamine  # noqa: F401
+
+    # Rust-based reader; several times faster than openpyxl for data-only reads
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = None  # pandas default (openpyxl in read-only mode for .xlsx)
+
 # Required columns that must be present for the app to function
 REQUIRED_COLUMNS = [
     "Term Description",
@@ -24,6 +32,9 @@ OPTIONAL_COLUMNS = [
     "Incomplete lapsed to F (@F)",
 ]
 
+# Columns that identify a course-term; stored as category after cleaning
+KEY_COLUMNS = ["Term Description", "Subject", "Catalog Number"]
+
 # All count columns that should be cast to numeric
 COUNT_COLUMNS = [
     "Official Class Enrollments",
@@ -44,7 +55,7 @@ def load_excel(file) -> tuple[pd.DataFrame, dict]:
     Returns:
         (df, info) where info has keys: total_rows, missing_columns, present_columns
     """
-    df = pd.read_excel(file, sheet_name="Export")
+    df = pd.read_excel(file, sheet_name="Export", engine=EXCEL_ENGINE)
     info = {
         "total_rows": len(df),
         "missing_required": [c for c in REQUIRED_COLUMNS if c not in df.columns],
@@ -60,35 +71,39 @@ def clean_dataframe(df: pd.DataFrame) -> tuple[pd.DataFrame, int, pd.DataFrame]:
     Returns:
         (cleaned_df, rollup_count, removed_rows)
     """
-    df = df.copy()
+    # Collect replacement columns and apply them in one assign, so the
+    # caller's frame is never modified and is only copied once.
+    updates = {}
 
     # Normalize identifier columns to string
     for col in ["Catalog Number", "Section Number"]:
         if col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
+            updates[col] = df[col].astype(str).str.strip()
 
     if "Subject" in df.columns:
-        df["Subject"] = df["Subject"].astype(str).str.strip()
+        updates["Subject"] = df["Subject"].astype(str).str.strip()
 
-    # Cast count fields to numeric, NaN -> 0
-    for col in COUNT_COLUMNS:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(float)
+    # Cast count fields to numeric, NaN -> 0, filling and casting all of them
+    # as one frame rather than column by column
+    present = [col for col in COUNT_COLUMNS if col in df.columns]
+    counts = df[present].apply(pd.to_numeric, errors="coerce")
+    updates.update(counts.fillna(0).astype(float).items())
 
     # Add missing optional columns as zeros
-    for col in OPTIONAL_COLUMNS:
-        if col not in df.columns:
-            df[col] = 0.0
+    updates.update({col: 0.0 for col in OPTIONAL_COLUMNS if col not in df.columns})
+
+    df = df.assign(**updates)
 
     total_before = len(df)
 
-    # Identify rollup rows (case-insensitive "Total" check)
+    # Identify rollup rows (case-insensitive "Total" check). Identifier
+    # columns repeat a handful of values, so lowercase and test the distinct
+    # values only and broadcast the result back through the factorize codes.
     def _is_rollup_value(series):
-        lower = series.str.lower()
-        return (
-            lower.isin(["total", "nan", "none", ""])
-            | series.isna()
-        )
+        codes, uniques = pd.factorize(series)
+        is_rollup = pd.Index(uniques).str.lower().isin(["total", "nan", "none", ""])
+        # Missing values get code -1, which picks the trailing True
+        return np.append(is_rollup, True)[codes]
 
     rollup_mask = (
         _is_rollup_value(df["Subject"])
@@ -96,8 +111,8 @@ def clean_dataframe(df: pd.DataFrame) -> tuple[pd.DataFrame, int, pd.DataFrame]:
         | _is_rollup_value(df["Section Number"])
     )
 
-    df_clean = df[~rollup_mask].copy().reset_index(drop=True)
-    removed_text = df[rollup_mask].copy().reset_index(drop=True)
+    df_clean = df[~rollup_mask].reset_index(drop=True)
+    removed_text = df[rollup_mask].reset_index(drop=True)
 
     # Second pass: detect sum-matching rollup rows.
     # For each term/subject/catalog group, if a row's enrollment equals the sum
@@ -107,9 +122,25 @@ def clean_dataframe(df: pd.DataFrame) -> tuple[pd.DataFrame, int, pd.DataFrame]:
     removed = pd.concat([removed_text, removed_sum], ignore_index=True)
     rollup_count = total_before - len(df_clean)
 
+    # Key columns repeat a small set of values; as categories, downstream
+    # groupbys and filters work on integer codes instead of hashing strings.
+    df_clean = df_clean.astype({col: "category" for col in KEY_COLUMNS})
+    df_clean["_course_key"] = _course_keys(df_clean)
+
     return df_clean, rollup_count, removed
 
 
+def _course_keys(df: pd.DataFrame) -> pd.Series:
+    """"SUBJECT CATALOG" label for each row, as a category.
+
+    Matches the labels offered by the course selector, so a selected course
+    is found with one column comparison.
+    """
+    return (
+        df["Subject"].astype(str) + " " + df["Catalog Number"].astype(str)
+    ).astype("category")
+
+
 def _remove_sum_matching_rollups(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Remove rows whose enrollment equals the sum of sibling rows in the same group.
 
@@ -119,39 +150,23 @@ def _remove_sum_matching_rollups(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Dat
     group_cols = ["Term Description", "Subject", "Catalog Number"]
     enroll_col = "Official Class Enrollments"
 
-    # Only check groups with 3+ rows (need at least 2 real sections + 1 total)
-    group_sizes = df.groupby(group_cols).size()
-    multi_groups = group_sizes[group_sizes >= 3].index
-
-    if len(multi_groups) == 0:
-        return df, pd.DataFrame(columns=df.columns)
-
-    rollup_indices = []
-
-    for keys in multi_groups:
-        mask = (
-            (df["Term Description"] == keys[0])
-            & (df["Subject"] == keys[1])
-            & (df["Catalog Number"] == keys[2])
-        )
-        group = df[mask]
+    grouped = df.groupby(group_cols)[enroll_col]
+    group_total = grouped.transform("sum")
+    group_size = grouped.transform("size")
 
-        if len(group) < 3:
-            continue
-
-        group_total = group[enroll_col].sum()
-        for idx, row in group.iterrows():
-            others_sum = group_total - row[enroll_col]
-            # If this row's enrollment equals the sum of all others, it's a rollup.
-            # Use a small tolerance for floating point.
-            if row[enroll_col] > 0 and abs(row[enroll_col] - others_sum) < 0.5:
-                rollup_indices.append(idx)
+    enroll = df[enroll_col]
+    others_sum = group_total - enroll
+    # Only check groups with 3+ rows (need at least 2 real sections + 1 total).
+    # Use a small tolerance for floating point.
+    rollup_mask = (
+        (group_size >= 3) & (enroll > 0) & ((enroll - others_sum).abs() < 0.5)
+    )
 
-    if not rollup_indices:
+    if not rollup_mask.any():
         return df, pd.DataFrame(columns=df.columns)
 
-    removed = df.loc[rollup_indices].copy()
-    df_clean = df.drop(index=rollup_indices).reset_index(drop=True)
+    removed = df[rollup_mask]
+    df_clean = df[~rollup_mask].reset_index(drop=True)
     return df_clean, removed
 
 
@@ -172,12 +187,10 @@ def build_course_term_averages(df: pd.DataFrame) -> pd.DataFrame:
     count_cols = ["Official Class Enrollments", "dfw_count", "drop_count",
                   "incomplete_count", "lapsed_incomplete_count", "repeat_count"]
 
-    # Average rates and counts across sections
-    agg_rates = df.groupby(group_cols, as_index=False)[rate_cols].mean()
-    agg_counts = df.groupby(group_cols, as_index=False)[count_cols].mean()
-    section_counts = df.groupby(group_cols, as_index=False).size()
-    section_counts = section_counts.rename(columns={"size": "num_sections"})
-
-    result = agg_rates.merge(agg_counts, on=group_cols)
-    result = result.merge(section_counts, on=group_cols)
+    # Average rates and counts across sections in a single grouping pass
+    grp = df.groupby(group_cols, observed=True)
+    result = grp[rate_cols + count_cols].mean()
+    result["num_sections"] = grp.size()
+    result = result.reset_index()
+    result["_course_key"] = _course_keys(result)
     return result
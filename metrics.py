@@ -9,41 +9,60 @@ def compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
 
     Works for both section-level and course-term aggregated tables.
     """
-    df = df.copy()
+    # Pull each column out once as an array; all arithmetic below is NumPy
+    def col(name):
+        return df[name].to_numpy()
 
-    enrollments = df["Official Class Enrollments"]
-    grades_used = df["Tot. # Grades used for DFW Rate Analysis"]
+    enrollments = col("Official Class Enrollments")
+    grades_used = col("Tot. # Grades used for DFW Rate Analysis")
 
     # DFW
-    df["dfw_count"] = df["Ds,Fs,Ws used for DFW Rate Analysis"]
-    df["dfw_rate"] = np.where(grades_used > 0, df["dfw_count"] / grades_used, np.nan)
+    dfw_count = col("Ds,Fs,Ws used for DFW Rate Analysis")
+    dfw_rate = _rate(dfw_count, grades_used)
 
     # Drops
-    df["drop_count"] = df["Dropped"]
-    df["drop_rate"] = np.where(enrollments > 0, df["drop_count"] / enrollments, np.nan)
+    drop_count = col("Dropped")
+    drop_rate = _rate(drop_count, enrollments)
 
     # Incompletes
-    df["incomplete_count"] = (
-        df["Incomplete (I)"]
-        + df["Extended Incomplete (EI)"]
-        + df["Permanent Incomplete (PI)"]
+    incomplete_count = (
+        col("Incomplete (I)")
+        + col("Extended Incomplete (EI)")
+        + col("Permanent Incomplete (PI)")
     )
     # Use grades_used as denominator; fallback to enrollments if grades_used is 0
     denom_inc = np.where(grades_used > 0, grades_used, enrollments)
-    df["incomplete_rate"] = np.where(
-        denom_inc > 0, df["incomplete_count"] / denom_inc, np.nan
-    )
+    incomplete_rate = _rate(incomplete_count, denom_inc)
 
     # Lapsed incompletes
-    df["lapsed_incomplete_count"] = df["Incomplete lapsed to F (@F)"]
-    df["lapsed_incomplete_rate"] = np.where(
-        denom_inc > 0, df["lapsed_incomplete_count"] / denom_inc, np.nan
-    )
+    lapsed_incomplete_count = col("Incomplete lapsed to F (@F)")
+    lapsed_incomplete_rate = _rate(lapsed_incomplete_count, denom_inc)
 
     # Repeats
-    df["repeat_count"] = df["Repeats"]
-    df["repeat_rate"] = np.where(
-        enrollments > 0, df["repeat_count"] / enrollments, np.nan
+    repeat_count = col("Repeats")
+    repeat_rate = _rate(repeat_count, enrollments)
+
+    # One assign builds the output frame; the input frame is left untouched.
+    return df.assign(
+        dfw_count=dfw_count,
+        dfw_rate=dfw_rate,
+        drop_count=drop_count,
+        drop_rate=drop_rate,
+        incomplete_count=incomplete_count,
+        incomplete_rate=incomplete_rate,
+        lapsed_incomplete_count=lapsed_incomplete_count,
+        lapsed_incomplete_rate=lapsed_incomplete_rate,
+        repeat_count=repeat_count,
+        repeat_rate=repeat_rate,
     )
 
-    return df
+
+def _rate(num, denom) -> np.ndarray:
+    """num / denom, NaN wherever denom is not positive.
+
+    Divides only the valid positions, so there is no inf intermediate or
+    second masking pass.
+    """
+    num = np.asarray(num, dtype=float)
+    denom = np.asarray(denom, dtype=float)
+    return np.divide(num, denom, out=np.full(len(num), np.nan), where=denom > 0)
@@ -3,9 +3,10 @@
 Operates on course-term averages (mean of section-level rates per term).
 """
 
+import functools
+
 import pandas as pd
 import numpy as np
-from scipy import stats
 
 
 RESULT_COLUMNS = [
@@ -46,106 +47,172 @@ def detect_patterns(
     Returns:
         DataFrame with one row per flagged course.
     """
-    df = course_term_df.copy()
-
-    df = _sort_terms(df)
-
-    # Filter by minimum average enrollments per section
-    df = df[df["Official Class Enrollments"] >= min_enrollments].copy()
-
-    if df.empty:
+    terms = course_term_df["Term Description"]
+    term_order = _build_term_order(terms.unique())
+    term_pos = _term_positions(terms, term_order)
+
+    # Lay the rows out course by course (in groupby key order) and
+    # chronologically within each course, as flat column arrays plus course
+    # offsets, so every per-course check is a segment reduction rather than a
+    # Python loop over groups. The frame itself is never filtered or reordered.
+    subj_codes, _ = pd.factorize(course_term_df["Subject"], sort=True)
+    cat_codes, catalogs = pd.factorize(course_term_df["Catalog Number"], sort=True)
+    course = subj_codes.astype(np.int64) * len(catalogs) + cat_codes
+
+    # Filter by minimum average enrollments per section (and drop missing keys)
+    enrollments = course_term_df["Official Class Enrollments"].to_numpy()
+    kept = np.flatnonzero(
+        (enrollments >= min_enrollments) & (subj_codes >= 0) & (cat_codes >= 0)
+    )
+    if len(kept) == 0:
         return _empty_result()
 
-    # Group by course
-    courses = df.groupby(["Subject", "Catalog Number"])
-
-    results = []
-    for (subject, catalog), group in courses:
-        group = group.sort_values("_term_order")
-        reasons = []
-
-        recent = group.tail(lookback_window)
-        if recent.empty:
-            continue
-
-        latest = recent.iloc[-1]
-
-        # 1. High DFW persistent
-        persistent = _check_persistent(
-            recent, "dfw_rate", dfw_threshold, consecutive_terms
-        )
-        if persistent:
-            reasons.append(persistent)
+    order = kept[np.lexsort((term_pos[kept], course[kept]))]
+    course = course[order]
+
+    def column(name, positions=slice(None)):
+        """Values of a column in the course/term layout."""
+        return course_term_df[name].to_numpy()[order[positions]]
+
+    def optional_column(name, positions):
+        """Like column(), but NaN if the optional column is absent."""
+        if name not in course_term_df.columns:
+            return np.nan
+        return column(name, positions)
+
+    starts = np.flatnonzero(np.r_[True, course[1:] != course[:-1]])
+    sizes = np.diff(np.r_[starts, len(course)])
+    n_courses = len(starts)
+    group = np.repeat(np.arange(n_courses), sizes)
+    last = starts + sizes - 1
+    # Position counted back from each course's latest term (0 = latest)
+    rev_pos = np.repeat(last, sizes) - np.arange(len(course))
+
+    dfw = column("dfw_rate").astype(float)
+    recent = (rev_pos < lookback_window) & ~np.isnan(dfw)
+
+    # 1. High DFW persistent
+    n_recent = np.bincount(group[recent], minlength=n_courses)
+    best_streak = _longest_streaks(
+        dfw[recent], group[recent], n_courses, dfw_threshold
+    )
+    persistent = (n_recent >= consecutive_terms) & (best_streak >= consecutive_terms)
 
-        # 2. Worsening trend
-        trend = _check_worsening_trend(
-            recent, "dfw_rate", dfw_threshold, trend_terms, trend_slope_cutoff
-        )
-        if trend:
-            reasons.append(trend)
+    # 2. Worsening trend
+    trend_window = recent & (rev_pos < trend_terms)
+    trend_first = np.maximum(starts, last - min(trend_terms, lookback_window) + 1)
+    slopes, trend_latest = _trend_slopes(
+        dfw[trend_window], group[trend_window], n_courses, dfw_threshold * 0.8
+    )
+    n_trend = np.bincount(group[trend_window], minlength=n_courses)
+    trend = slopes > trend_slope_cutoff
 
-        # 3. Spike anomaly
-        spike = _check_spike(recent, "dfw_rate")
-        if spike:
-            reasons.append(spike)
+    # 3. Spike anomaly
+    spike, spike_latest, prior_mean = _spikes(dfw[recent], group[recent], n_courses)
 
-        # 4. Co-occurring issues
-        co_issues = _check_co_occurring(
-            latest, dfw_threshold, drop_threshold, incomplete_threshold
-        )
-        if co_issues:
-            reasons.append(co_issues)
-
-        if reasons:
-            results.append(
-                {
-                    "Subject": subject,
-                    "Catalog Number": catalog,
-                    "latest_dfw_rate": latest["dfw_rate"],
-                    "latest_drop_rate": latest["drop_rate"],
-                    "latest_incomplete_rate": latest["incomplete_rate"],
-                    "latest_repeat_rate": latest.get("repeat_rate", np.nan),
-                    "latest_enrollments": latest["Official Class Enrollments"],
-                    "avg_enrollments": group["Official Class Enrollments"].mean(),
-                    "latest_num_sections": latest.get("num_sections", np.nan),
-                    "reasons": reasons,
-                    "latest_term": latest["Term Description"],
-                }
-            )
+    # 4. Co-occurring issues
+    latest_dfw = dfw[last]
+    latest_drop = column("drop_rate", last).astype(float)
+    latest_inc = column("incomplete_rate", last).astype(float)
+    high_dfw = latest_dfw >= dfw_threshold
+    high_drop = latest_drop >= drop_threshold
+    high_inc = latest_inc >= incomplete_threshold
+    co_occurring = high_dfw & (high_drop | high_inc)
 
-    if not results:
-        return _empty_result()
+    flagged = persistent | trend | spike | co_occurring
 
     # Filter out stale courses not offered recently
-    term_order = _build_term_order(course_term_df["Term Description"].unique())
     if term_order:
         max_order = max(term_order.values())
-        results = [
-            r for r in results
-            if max_order - term_order.get(r["latest_term"], 0) < recency_terms
-        ]
+        latest_order = term_pos[order[last]]
+        flagged &= max_order - latest_order < recency_terms
 
-    if not results:
+    if not flagged.any():
         return _empty_result()
 
-    result_df = pd.DataFrame(results)
+    term_labels = column("Term Description")
+    reasons = [[] for _ in range(n_courses)]
+    for g in np.flatnonzero(persistent & flagged):
+        reasons[g].append(
+            f"Avg DFW rate above {dfw_threshold:.0%} for "
+            f"{best_streak[g]} terms in a row"
+        )
+    for g in np.flatnonzero(trend & flagged):
+        reasons[g].append(
+            f"Avg DFW rate rising (+{slopes[g]:.1%}/term) "
+            f"over the last {n_trend[g]} terms "
+            f"({term_labels[trend_first[g]]} to {term_labels[last[g]]}), "
+            f"latest at {trend_latest[g]:.1%}"
+        )
+    for g in np.flatnonzero(spike & flagged):
+        reasons[g].append(
+            f"Latest avg DFW rate ({spike_latest[g]:.1%}) is a spike — "
+            f"prior average was {prior_mean[g]:.1%} "
+            f"(more than 2 std deviations above normal)"
+        )
+    for g in np.flatnonzero(co_occurring & flagged):
+        parts = [f"DFW rate ({latest_dfw[g]:.1%}) above {dfw_threshold:.0%}"]
+        if high_drop[g]:
+            parts.append(
+                f"drop rate ({latest_drop[g]:.1%}) above {drop_threshold:.0%}"
+            )
+        if high_inc[g]:
+            parts.append(
+                f"incomplete rate ({latest_inc[g]:.1%}) above {incomplete_threshold:.0%}"
+            )
+        reasons[g].append("Multiple issues in latest term: " + "; ".join(parts))
+
+    enroll = column("Official Class Enrollments").astype(float)
+    keep = np.flatnonzero(flagged)
+    rows = last[keep]
+    result_df = pd.DataFrame(
+        {
+            "Subject": column("Subject", rows),
+            "Catalog Number": column("Catalog Number", rows),
+            "latest_dfw_rate": latest_dfw[keep],
+            "latest_drop_rate": latest_drop[keep],
+            "latest_incomplete_rate": latest_inc[keep],
+            "latest_repeat_rate": optional_column("repeat_rate", rows),
+            "latest_enrollments": enroll[rows],
+            # Slice means keep Series.mean's summation order (reduceat's
+            # differs in the last bit, which can flip one-decimal display)
+            "avg_enrollments": [
+                enroll[starts[g]:last[g] + 1].mean() for g in keep
+            ],
+            "latest_num_sections": optional_column("num_sections", rows),
+            "reasons": [reasons[g] for g in keep],
+            "latest_term": term_labels[rows],
+        }
+    )
     result_df = result_df.sort_values("latest_dfw_rate", ascending=False).reset_index(
         drop=True
     )
     return result_df
 
 
-def _sort_terms(df: pd.DataFrame) -> pd.DataFrame:
-    """Add a _term_order column for chronological sorting."""
-    df = df.copy()
-    term_order = _build_term_order(df["Term Description"].unique())
-    df["_term_order"] = df["Term Description"].map(term_order)
-    df = df.sort_values("_term_order")
-    return df
+def _term_positions(terms: pd.Series, term_order: dict) -> np.ndarray:
+    """Chronological position of each term (NaN for unknown/missing terms)."""
+    if isinstance(terms.dtype, pd.CategoricalDtype):
+        # Look each category up once and broadcast through the integer codes;
+        # the trailing NaN is picked by code -1 (missing)
+        by_code = np.array(
+            [term_order.get(c, np.nan) for c in terms.cat.categories] + [np.nan],
+            dtype=float,
+        )
+        return by_code[terms.cat.codes.to_numpy()]
+    return terms.map(term_order).to_numpy(dtype=float)
 
 
 def _build_term_order(terms) -> dict:
-    """Build a sort-order mapping for term descriptions."""
+    """Build a sort-order mapping for term descriptions.
+
+    Memoized on the set of terms, so callers must not mutate the result.
+    """
+    return _term_order_for(frozenset(terms))
+
+
+@functools.lru_cache(maxsize=8)
+def _term_order_for(terms: frozenset) -> dict:
     season_order = {"spring": 0, "summer": 1, "fall": 2, "winter": 3}
 
     def term_sort_key(term):
@@ -163,125 +230,96 @@ def _build_term_order(terms) -> dict:
     return {t: i for i, t in enumerate(sorted_terms)}
 
 
-def _check_persistent(
-    df: pd.DataFrame, rate_col: str, threshold: float, n_consecutive: int
-) -> str | None:
-    """Check if rate_col is >= threshold for at least n_consecutive terms.
-
-    Returns a descriptive string if flagged, None otherwise.
-    """
-    values = df[rate_col].dropna().values
-    if len(values) < n_consecutive:
-        return None
-
-    # Find the longest streak and the terms it spans
-    best_streak = 0
-    streak = 0
-    for v in values:
-        if v >= threshold:
-            streak += 1
-            best_streak = max(best_streak, streak)
-        else:
-            streak = 0
-
-    if best_streak >= n_consecutive:
-        return (
-            f"Avg DFW rate above {threshold:.0%} for "
-            f"{best_streak} terms in a row"
-        )
-    return None
-
-
-def _check_worsening_trend(
-    df: pd.DataFrame,
-    rate_col: str,
-    threshold: float,
-    trend_terms: int,
-    slope_cutoff: float,
-) -> str | None:
-    """Check if there's a positive slope over the last K terms.
+def _longest_streaks(
+    values: np.ndarray, group: np.ndarray, n_groups: int, threshold: float
+) -> np.ndarray:
+    """Longest run of consecutive values >= threshold within each group.
 
-    Returns a descriptive string if flagged, None otherwise.
+    values must be laid out group by group in chronological order.
     """
-    recent = df.tail(trend_terms)
-    values = recent[rate_col].dropna().values
-    if len(values) < 3:
-        return None
-
-    x = np.arange(len(values))
-    slope, _, _, _, _ = stats.linregress(x, values)
-
-    latest = values[-1]
-    if slope > slope_cutoff and latest >= threshold * 0.8:
-        terms_used = len(values)
-        first_term = recent.iloc[0]["Term Description"]
-        last_term = recent.iloc[-1]["Term Description"]
-        return (
-            f"Avg DFW rate rising (+{slope:.1%}/term) "
-            f"over the last {terms_used} terms "
-            f"({first_term} to {last_term}), "
-            f"latest at {latest:.1%}"
-        )
-    return None
-
-
-def _check_spike(df: pd.DataFrame, rate_col: str) -> str | None:
-    """Flag if latest term is > mean + 2*std within the lookback window.
-
-    Returns a descriptive string if flagged, None otherwise.
+    best = np.zeros(n_groups, dtype=np.int64)
+    above = values >= threshold
+    if not above.any():
+        return best
+
+    pos = np.arange(len(values))
+    # A run is broken by any value below threshold and by the start of a group
+    breaks = np.where(above, -1, pos)
+    group_start = np.r_[True, group[1:] != group[:-1]] & above
+    breaks[group_start] = pos[group_start] - 1
+    streaks = pos - np.maximum.accumulate(breaks)
+    np.maximum.at(best, group, streaks)
+    return best
+
+
+def _trend_slopes(
+    values: np.ndarray, group: np.ndarray, n_groups: int, min_latest: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """Least-squares slope of each group's values against term index.
+
+    Only groups with at least 3 values whose latest value reaches min_latest
+    get a slope; the rest are NaN. Also returns each group's latest value.
     """
-    values = df[rate_col].dropna().values
-    if len(values) < 3:
-        return None
-
-    prior = values[:-1]
-    mean = prior.mean()
-    std = prior.std()
-    if std == 0:
-        return None
-
-    latest = values[-1]
-    if latest > mean + 2 * std:
-        return (
-            f"Latest avg DFW rate ({latest:.1%}) is a spike — "
-            f"prior average was {mean:.1%} "
-            f"(more than 2 std deviations above normal)"
-        )
-    return None
+    slopes = np.full(n_groups, np.nan)
+    latest = np.full(n_groups, np.nan)
+    bounds = np.searchsorted(group, np.arange(n_groups + 1))
+    latest_idx = bounds[1:] - 1
+    has_values = bounds[1:] > bounds[:-1]
+    latest[has_values] = values[latest_idx[has_values]]
+
+    counts = bounds[1:] - bounds[:-1]
+    candidates = (counts >= 3) & (latest >= min_latest)
+    if not candidates.any():
+        return slopes, latest
+
+    # slope = sum((x - x_mean) * (y - y_mean)) / sum((x - x_mean) ** 2), with
+    # x = 0..n-1 within each group's segment
+    in_candidate = candidates[group]
+    y = values[in_candidate]
+    sizes = counts[candidates]
+    seg_starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    x_dev = np.arange(len(y)) - np.repeat(seg_starts + (sizes - 1) / 2, sizes)
+    y_dev = y - np.repeat(np.add.reduceat(y, seg_starts) / sizes, sizes)
+    slopes[candidates] = (
+        np.add.reduceat(x_dev * y_dev, seg_starts)
+        / np.add.reduceat(x_dev * x_dev, seg_starts)
+    )
+    return slopes, latest
 
 
-def _check_co_occurring(
-    latest: pd.Series,
-    dfw_threshold: float,
-    drop_threshold: float,
-    incomplete_threshold: float,
-) -> str | None:
-    """Check for co-occurring high DFW + high drop or high incomplete.
+def _spikes(
+    values: np.ndarray, group: np.ndarray, n_groups: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Flag groups whose latest value is > mean + 2*std of the prior values.
 
-    Returns a descriptive string if flagged, None otherwise.
+    Groups need at least 3 values. Returns (flags, latest, prior_mean).
     """
-    high_dfw = (
-        not pd.isna(latest["dfw_rate"]) and latest["dfw_rate"] >= dfw_threshold
-    )
-    high_drop = (
-        not pd.isna(latest["drop_rate"]) and latest["drop_rate"] >= drop_threshold
-    )
-    high_inc = (
-        not pd.isna(latest["incomplete_rate"])
-        and latest["incomplete_rate"] >= incomplete_threshold
-    )
-
-    parts = []
-    if high_dfw:
-        parts.append(f"DFW rate ({latest['dfw_rate']:.1%}) above {dfw_threshold:.0%}")
-    if high_drop:
-        parts.append(f"drop rate ({latest['drop_rate']:.1%}) above {drop_threshold:.0%}")
-    if high_inc:
-        parts.append(f"incomplete rate ({latest['incomplete_rate']:.1%}) above {incomplete_threshold:.0%}")
-
-    if high_dfw and (high_drop or high_inc):
-        return "Multiple issues in latest term: " + "; ".join(parts)
-    return None
+    flags = np.zeros(n_groups, dtype=bool)
+    latest = np.full(n_groups, np.nan)
+    prior_mean = np.full(n_groups, np.nan)
+
+    counts = np.bincount(group, minlength=n_groups)
+    eligible = counts[group] >= 3
+    is_latest = np.r_[group[1:] != group[:-1], True]
+
+    prior = eligible & ~is_latest
+    if not prior.any():
+        return flags, latest, prior_mean
+
+    prior_values = values[prior]
+    prior_group = group[prior]
+    seg_starts = np.flatnonzero(np.r_[True, prior_group[1:] != prior_group[:-1]])
+    seg_sizes = np.diff(np.r_[seg_starts, len(prior_values)])
+    groups = prior_group[seg_starts]
+
+    mean = np.add.reduceat(prior_values, seg_starts) / seg_sizes
+    dev = prior_values - np.repeat(mean, seg_sizes)
+    std = np.sqrt(np.add.reduceat(dev * dev, seg_starts) / seg_sizes)
+
+    latest[groups] = values[eligible & is_latest]
+    prior_mean[groups] = mean
+    flags[groups] = (std != 0) & (latest[groups] > mean + 2 * std)
+    return flags, latest, prior_mean
 
 
 def _empty_result() -> pd.DataFrame:
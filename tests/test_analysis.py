@@ -0,0 +1,224 @@
+"""Tests for analysis module."""
+
+import pandas as pd
+from analysis import (
+    classify_severity,
+    generate_analysis,
+    _reason_flags,
+    _section_stats,
+    _summarize_reasons,
+)
+
+
+SETTINGS = {"dfw_threshold": 0.20}
+
+PERSISTENT = "Avg DFW rate above 20% for 3 terms in a row"
+TREND = (
+    "Avg DFW rate rising (+5.0%/term) over the last 4 terms "
+    "(Spring 2020 to Spring 2023), latest at 25.0%"
+)
+SPIKE = (
+    "Latest avg DFW rate (50.0%) is a spike — prior average was 5.0% "
+    "(more than 2 std deviations above normal)"
+)
+MULTI = (
+    "Multiple issues in latest term: DFW rate (30.0%) above 20%; "
+    "drop rate (15.0%) above 10%"
+)
+
+
+def _make_flagged(courses):
+    """Build a flagged_df from (subject, catalog, dfw_rate, reasons) tuples."""
+    return pd.DataFrame(
+        [
+            {
+                "Subject": subject,
+                "Catalog Number": catalog,
+                "latest_dfw_rate": dfw,
+                "latest_drop_rate": 0.05,
+                "latest_incomplete_rate": 0.0,
+                "latest_repeat_rate": 0.0,
+                "latest_enrollments": 30.0,
+                "avg_enrollments": 30.0,
+                "latest_num_sections": 1.0,
+                "reasons": reasons,
+                "latest_term": "Spring 2023",
+            }
+            for subject, catalog, dfw, reasons in courses
+        ]
+    )
+
+
+def _make_sections(subject, catalog, dfw_rates, term="Spring 2023"):
+    return pd.DataFrame(
+        {
+            "Subject": subject,
+            "Catalog Number": catalog,
+            "Term Description": term,
+            "Section Number": [f"{i + 1:03d}" for i in range(len(dfw_rates))],
+            "dfw_rate": dfw_rates,
+        }
+    )
+
+
+def _make_course_terms(subject, catalog, dfw_rates):
+    return pd.DataFrame(
+        {
+            "Subject": subject,
+            "Catalog Number": catalog,
+            "Term Description": [f"Spring {2020 + i}" for i in range(len(dfw_rates))],
+            "dfw_rate": dfw_rates,
+        }
+    )
+
+
+def test_reason_flags_tags_each_reason():
+    flagged = _make_flagged([("MATH", "101", 0.25, [PERSISTENT, MULTI])])
+    flags = _reason_flags(flagged["reasons"])
+    assert len(flags) == 2
+    assert flags["persistent"].tolist() == [True, False]
+    assert flags["co_occurring"].tolist() == [False, True]
+    assert not flags["trend"].any()
+
+
+def test_summarize_reasons_mask_and_streak():
+    tag_mask, streak = _summarize_reasons((TREND, PERSISTENT))
+    # persistent (4) | trend (2); the trend reason's "4 terms" is not a streak
+    assert tag_mask == 6
+    assert streak == "3"
+    assert _summarize_reasons((SPIKE,)) == (1, None)
+
+
+def test_persistent_is_immediate():
+    flagged = _make_flagged([("MATH", "101", 0.25, [PERSISTENT])])
+    sections = _make_sections("MATH", "101", [0.25])
+    ct = _make_course_terms("MATH", "101", [0.22, 0.24, 0.25])
+    tiers = classify_severity(flagged, ct, sections, SETTINGS)
+    assert len(tiers["immediate"]) == 1
+    entry = tiers["immediate"][0]
+    assert entry["headline"] == "DFW rate at 25% for 3 consecutive terms"
+    assert entry["action"] == "Review prerequisites, pedagogy, and grading practices"
+
+
+def test_trend_is_moderate_and_spike_headline():
+    flagged = _make_flagged(
+        [("MATH", "101", 0.25, [TREND]), ("ENG", "200", 0.22, [SPIKE])]
+    )
+    sections = pd.concat(
+        [_make_sections("MATH", "101", [0.25]), _make_sections("ENG", "200", [0.22])]
+    )
+    ct = pd.concat(
+        [
+            _make_course_terms("MATH", "101", [0.10, 0.25]),
+            _make_course_terms("ENG", "200", [0.05, 0.22]),
+        ]
+    )
+    tiers = classify_severity(flagged, ct, sections, SETTINGS)
+    assert [c["course"] for c in tiers["moderate"]] == ["MATH 101", "ENG 200"]
+    assert tiers["moderate"][0]["headline"] == "DFW rate rising, now at 25% in Spring 2023"
+    assert tiers["moderate"][1]["headline"] == "DFW rate spiked to 22% in Spring 2023"
+
+
+def test_section_variation_detected():
+    flagged = _make_flagged([("MATH", "101", 0.25, [TREND])])
+    sections = _make_sections("MATH", "101", [0.05, 0.45])
+    ct = _make_course_terms("MATH", "101", [0.10, 0.25])
+    tiers = classify_severity(flagged, ct, sections, SETTINGS)
+    entry = tiers["moderate"][0]
+    assert entry["has_section_variation"]
+
+
+def test_executive_summary_counts():
+    flagged = _make_flagged(
+        [
+            ("MATH", "101", 0.25, [PERSISTENT, MULTI]),
+            ("ENG", "200", 0.22, [PERSISTENT]),
+            ("BIO", "150", 0.35, [SPIKE]),
+        ]
+    )
+    sections = pd.concat(
+        [
+            _make_sections("MATH", "101", [0.25]),
+            _make_sections("ENG", "200", [0.22]),
+            _make_sections("BIO", "150", [0.35]),
+        ]
+    )
+    ct = pd.concat(
+        [
+            _make_course_terms("MATH", "101", [0.25]),
+            _make_course_terms("ENG", "200", [0.22]),
+            _make_course_terms("BIO", "150", [0.35]),
+            _make_course_terms("HIST", "110", [0.05]),
+        ]
+    )
+    report = generate_analysis(flagged, ct, sections, SETTINGS)
+    assert "Out of **4 courses** analyzed, **3** (75%)" in report
+    assert "- **2** with persistently high DFW rates" in report
+    assert "- **1** with unusual spikes" in report
+    assert "- **1** with multiple co-occurring issues" in report
+    assert "worsening DFW trends" not in report
+
+
+def test_supporting_detail_order_and_history():
+    flagged = _make_flagged(
+        [
+            ("BIO", "150", 0.35, [SPIKE]),
+            ("MATH", "101", 0.25, [PERSISTENT, MULTI]),
+        ]
+    )
+    sections = pd.concat(
+        [
+            _make_sections("MATH", "101", [0.05, 0.45]),
+            _make_sections("BIO", "150", [0.35]),
+        ]
+    )
+    ct = pd.concat(
+        [
+            _make_course_terms("MATH", "101", [0.20, 0.30]),
+            _make_course_terms("BIO", "150", [0.35]),
+        ]
+    )
+    report = generate_analysis(flagged, ct, sections, SETTINGS)
+    detail = report.split("## Supporting Detail")[1]
+    # More reasons ranks first, then higher DFW rate
+    assert detail.index("### 1. MATH 101") < detail.index("### 2. BIO 150")
+    assert "**Historical avg DFW rate:** 25.0% (across 2 terms)" in detail
+    assert "DFW rates range from 5.0% to 45.0%" in detail
+
+
+def test_empty_flagged():
+    flagged = _make_flagged([]).reindex(columns=["Subject", "reasons"])
+    report = generate_analysis(flagged, pd.DataFrame(), pd.DataFrame(), SETTINGS)
+    assert report.startswith("## No Courses Flagged")
+    tiers = classify_severity(flagged, pd.DataFrame(), pd.DataFrame(), SETTINGS)
+    assert tiers == {"immediate": [], "moderate": [], "watch": []}
+
+
+def test_categorical_keys():
+    """Category-typed key columns give the same tiers as plain strings."""
+    flagged = _make_flagged([("MATH", "101", 0.25, [TREND])])
+    sections = pd.concat(
+        [
+            _make_sections("MATH", "101", [0.05, 0.45]),
+            _make_sections("ENG", "200", [0.10], term="Fall 2022"),
+        ]
+    )
+    ct = _make_course_terms("MATH", "101", [0.10, 0.25])
+    expected = classify_severity(flagged, ct, sections, SETTINGS)
+    for col in ["Subject", "Catalog Number", "Term Description"]:
+        sections[col] = sections[col].astype("category")
+        ct[col] = ct[col].astype("category")
+    assert classify_severity(flagged, ct, sections, SETTINGS) == expected
+    report = generate_analysis(flagged, ct, sections, SETTINGS)
+    assert "(across 2 terms)" in report
+
+
+def test_generate_analysis_reuses_tiers():
+    flagged = _make_flagged([("MATH", "101", 0.25, [PERSISTENT])])
+    sections = _make_sections("MATH", "101", [0.25])
+    ct = _make_course_terms("MATH", "101", [0.22, 0.24, 0.25])
+    stats = _section_stats(sections, flagged)
+    tiers = classify_severity(flagged, ct, sections, SETTINGS, section_stats=stats)
+    assert generate_analysis(
+        flagged, ct, sections, SETTINGS, tiers=tiers, section_stats=stats
+    ) == generate_analysis(flagged, ct, sections, SETTINGS)
@@ -135,3 +135,22 @@ def test_sum_matching_does_not_remove_real_sections():
     cleaned, rollup_count, _ = clean_dataframe(df)
     assert rollup_count == 0
     assert len(cleaned) == 2
+
+
+def test_key_columns_are_categorical():
+    df = pd.DataFrame([_make_section_row(), _make_section_row(section="002")])
+    cleaned, _, _ = clean_dataframe(df)
+    for col in ["Term Description", "Subject", "Catalog Number"]:
+        assert isinstance(cleaned[col].dtype, pd.CategoricalDtype)
+    assert cleaned["Section Number"].dtype == object
+
+
+def test_course_key_column():
+    rows = [
+        _make_section_row(section="001"),
+        _make_section_row(section="002", catalog="101L"),
+    ]
+    cleaned, _, _ = clean_dataframe(pd.DataFrame(rows))
+    assert cleaned["_course_key"].tolist() == ["MATH 101", "MATH 101L"]
+    ct = build_course_term_averages(compute_metrics(cleaned))
+    assert sorted(ct["_course_key"]) == ["MATH 101", "MATH 101L"]
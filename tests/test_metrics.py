@@ -72,3 +72,17 @@ def test_incomplete_fallback_to_enrollments():
     )
     # Falls back to enrollments: 3/30
     assert df.iloc[0]["incomplete_rate"] == pytest.approx(3 / 30)
+
+
+def test_rate_exact_at_threshold():
+    # Rates feed ">= threshold" checks, so 7/35 must be exactly 0.2
+    # (7 * (1 / 35) is not)
+    df = compute_metrics(
+        _make_df(
+            **{
+                "Tot. # Grades used for DFW Rate Analysis": 35,
+                "Ds,Fs,Ws used for DFW Rate Analysis": 7,
+            }
+        )
+    )
+    assert df.iloc[0]["dfw_rate"] == 0.2
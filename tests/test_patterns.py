@@ -5,7 +5,7 @@ import numpy as np
 import pytest
 from metrics import compute_metrics
 from data_loader import build_course_term_averages
-from patterns import detect_patterns
+from patterns import detect_patterns, _build_term_order
 
 
 def _make_section_rows(dfw_rates, enrollments=30, grades_used=28,
@@ -87,6 +87,15 @@ def test_worsening_trend():
         assert any("rising" in r for r in reasons)
 
 
+def test_trend_slope_rounds_exact_half_up():
+    # Slope is exactly 0.4375; scipy's linregress gave 0.43749999999999994
+    rows = _make_section_rows([0.0, 0.5, 0.875], grades_used=8)
+    ct = _build_course_avg(rows)
+    flagged = detect_patterns(ct, dfw_threshold=0.20, min_enrollments=1)
+    reasons = flagged.iloc[0]["reasons"]
+    assert any("rising (+43.8%/term)" in r for r in reasons)
+
+
 def test_averaging_across_sections():
     """Two sections in the same term should be averaged, not summed."""
     rows_001 = _make_section_rows([0.21, 0.21, 0.21], section="001")
@@ -133,3 +142,37 @@ def test_empty_input():
     )
     flagged = detect_patterns(df)
     assert len(flagged) == 0
+
+
+def test_categorical_terms_sorted_chronologically():
+    """Category-typed terms sort by term order, not category (alphabetical) order."""
+    rows = _make_section_rows([0.05, 0.06, 0.05, 0.50], grades_used=100)
+    terms = ["Spring 2020", "Fall 2020", "Spring 2021", "Fall 2021"]
+    for row, term in zip(rows, terms):
+        row["Term Description"] = term
+    ct = _build_course_avg(rows)
+    ct["Term Description"] = ct["Term Description"].astype("category")
+    flagged = detect_patterns(ct, min_enrollments=1)
+    assert flagged.iloc[0]["latest_term"] == "Fall 2021"
+    assert any("spike" in r for r in flagged.iloc[0]["reasons"])
+
+
+def test_persistent_streak_does_not_span_courses():
+    """A high last term in one course and a high first term in the next
+    course are not a streak."""
+    rows = _make_section_rows([0.05, 0.30], subject="BIO") + _make_section_rows(
+        [0.30, 0.05], subject="CHEM"
+    )
+    ct = _build_course_avg(rows)
+    flagged = detect_patterns(ct, dfw_threshold=0.20, consecutive_terms=2,
+                              min_enrollments=1)
+    assert len(flagged) == 0
+
+
+def test_build_term_order_chronological_and_memoized():
+    order = _build_term_order(["Fall 2020", "Spring 2021", "Spring 2020", "Summer 2020"])
+    assert list(order) == ["Spring 2020", "Summer 2020", "Fall 2020", "Spring 2021"]
+    # Same set of terms in any order or container reuses the cached mapping
+    assert _build_term_order(
+        pd.Series(["Spring 2021", "Spring 2020", "Fall 2020", "Summer 2020"]).unique()
+    ) is order
@@ -7,7 +7,8 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from patterns import _build_term_order
+import pyarrow as pa
+from patterns import _build_term_order, _term_positions
 
 THRESHOLD_DEFAULTS = {
     "catalog_search": "",
@@ -173,24 +174,30 @@ def render_thresholds_admin() -> dict:
 
 
 def apply_filters(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
-    """Apply term, subject, and catalog filters to a dataframe."""
-    filtered = df.copy()
+    """Apply term, subject, and catalog filters to a dataframe.
+
+    The active filters are combined into one boolean mask and applied with a
+    single indexing step; with no active filters, df itself is returned.
+    """
+    mask = np.ones(len(df), dtype=bool)
 
     if filters["selected_terms"]:
-        filtered = filtered[
-            filtered["Term Description"].isin(filters["selected_terms"])
-        ]
+        mask &= df["Term Description"].isin(filters["selected_terms"]).to_numpy()
 
     if filters["selected_subjects"]:
-        filtered = filtered[filtered["Subject"].isin(filters["selected_subjects"])]
+        mask &= df["Subject"].isin(filters["selected_subjects"]).to_numpy()
 
     if filters.get("catalog_search"):
-        filtered = filtered[
-            filtered["Catalog Number"]
-            .str.contains(filters["catalog_search"], case=False, na=False)
-        ]
+        # Plain substring match: catalog searches are typed text, not patterns
+        mask &= (
+            df["Catalog Number"]
+            .str.contains(filters["catalog_search"], case=False, na=False, regex=False)
+            .to_numpy()
+        )
 
-    return filtered
+    if mask.all():
+        return df
+    return df[mask]
 
 
 def render_flagged_table(flagged_df: pd.DataFrame) -> str | None:
@@ -201,54 +208,17 @@ def render_flagged_table(flagged_df: pd.DataFrame) -> str | None:
 
     st.subheader(f"Flagged Courses ({len(flagged_df)})")
 
-    display = flagged_df.copy()
-    display["reasons_str"] = display["reasons"].apply(lambda r: ", ".join(r))
-
-    rate_cols = [
-        "latest_dfw_rate",
-        "latest_drop_rate",
-        "latest_incomplete_rate",
-        "latest_repeat_rate",
-    ]
-    for col in rate_cols:
-        display[col] = display[col].apply(
-            lambda x: f"{x:.1%}" if pd.notna(x) else "N/A"
-        )
-    display["avg_enrollments"] = display["avg_enrollments"].apply(
-        lambda x: f"{x:.1f}"
-    )
-    display["latest_enrollments"] = display["latest_enrollments"].apply(
-        lambda x: f"{x:.1f}"
-    )
-    display["latest_num_sections"] = display["latest_num_sections"].apply(
-        lambda x: f"{x:.0f}" if pd.notna(x) else "N/A"
-    )
-
-    display_cols = {
-        "Subject": "Subject",
-        "Catalog Number": "Catalog #",
-        "reasons_str": "Reasons Flagged",
-        "latest_term": "Latest Term",
-        "latest_num_sections": "Sections",
-        "latest_dfw_rate": "Avg DFW Rate",
-        "latest_drop_rate": "Avg Drop Rate",
-        "latest_incomplete_rate": "Avg Incomplete Rate",
-        "latest_repeat_rate": "Avg Repeat Rate",
-        "latest_enrollments": "Avg Enrollment/Section",
-        "avg_enrollments": "Avg Enrollment/Section (All Terms)",
-    }
-
-    st.dataframe(
-        display[list(display_cols.keys())].rename(columns=display_cols),
-        use_container_width=True,
-        hide_index=True,
+    display = _format_flagged(
+        flagged_df.assign(reasons=flagged_df["reasons"].str.join(", "))
     )
+    st.dataframe(display, use_container_width=True, hide_index=True)
 
     # Course selector for drill-down
-    course_options = list(dict.fromkeys(
-        f"{row['Subject']} {row['Catalog Number']}"
-        for _, row in flagged_df.iterrows()
-    ))
+    course_options = (
+        flagged_df["Subject"].astype(str)
+        + " "
+        + flagged_df["Catalog Number"].astype(str)
+    ).drop_duplicates().tolist()
     if course_options:
         selected = st.selectbox(
             "Select a course for drill-down",
@@ -261,6 +231,52 @@ def render_flagged_table(flagged_df: pd.DataFrame) -> str | None:
     return None
 
 
+@st.cache_data(show_spinner=False, max_entries=16)
+def _format_flagged(flagged_df: pd.DataFrame) -> pa.Table:
+    """Format the flagged courses (reasons already joined) for display.
+
+    Cached so reruns triggered by unrelated widgets reuse the formatted
+    table. It is returned as an Arrow table, which is what st.dataframe
+    sends to the browser, so a cache hit skips the pandas conversion too.
+    """
+    display = pd.DataFrame(
+        {
+            "Subject": flagged_df["Subject"],
+            "Catalog #": flagged_df["Catalog Number"],
+            "Reasons Flagged": flagged_df["reasons"],
+            "Latest Term": flagged_df["latest_term"],
+            "Sections": _fmt_num(flagged_df["latest_num_sections"], 0, na="N/A"),
+            "Avg DFW Rate": _fmt_pct(flagged_df["latest_dfw_rate"]),
+            "Avg Drop Rate": _fmt_pct(flagged_df["latest_drop_rate"]),
+            "Avg Incomplete Rate": _fmt_pct(flagged_df["latest_incomplete_rate"]),
+            "Avg Repeat Rate": _fmt_pct(flagged_df["latest_repeat_rate"]),
+            "Avg Enrollment/Section": _fmt_num(flagged_df["latest_enrollments"]),
+            "Avg Enrollment/Section (All Terms)": _fmt_num(
+                flagged_df["avg_enrollments"]
+            ),
+        }
+    )
+    return pa.Table.from_pandas(display, preserve_index=False)
+
+
+def _fmt_pct(values) -> np.ndarray:
+    """Format rates like f"{x:.1%}", with "N/A" for missing values."""
+    x = np.asarray(values, dtype=float)
+    return np.where(np.isnan(x), "N/A", np.char.mod("%.1f%%", x * 100))
+
+
+def _fmt_num(values, decimals: int = 1, na: str | None = None) -> np.ndarray:
+    """Format numbers like f"{x:.{decimals}f}".
+
+    Missing values become na when given, otherwise "nan" as the f-string would.
+    """
+    x = np.asarray(values, dtype=float)
+    text = np.char.mod(f"%.{decimals}f", x)
+    if na is None:
+        return text
+    return np.where(np.isnan(x), na, text)
+
+
 def render_course_drilldown(
     course_key: str,
     course_term_df: pd.DataFrame,
@@ -270,31 +286,35 @@ def render_course_drilldown(
     incomplete_threshold: float,
 ):
     """Render the drill-down view for a selected course."""
-    parts = course_key.split(" ", 1)
-    subject, catalog = parts[0], parts[1]
-
-    st.subheader(f"Course Detail: {subject} {catalog}")
+    st.subheader(f"Course Detail: {course_key}")
 
     # Course-term averages for this course
-    ct = course_term_df[
-        (course_term_df["Subject"] == subject)
-        & (course_term_df["Catalog Number"] == catalog)
-    ].copy()
+    ct = course_term_df[course_term_df["_course_key"] == course_key]
 
     if ct.empty:
         st.warning("No data found for this course in the filtered dataset.")
         return
 
-    # Sort by term order
-    term_order = _build_term_order(ct["Term Description"].unique())
-    ct["_order"] = ct["Term Description"].map(term_order)
-    ct = ct.sort_values("_order")
+    # Sort by term order. The order is built from the whole frame's terms so
+    # every drill-down on the same data hits the same memoized mapping.
+    term_order = _build_term_order(course_term_df["Term Description"].unique())
+    ct = ct.assign(
+        _order=_term_positions(ct["Term Description"], term_order)
+    ).sort_values("_order")
 
     # Trend chart — course averages over terms
     _render_trend_chart(ct, dfw_threshold, drop_threshold, incomplete_threshold)
 
     # Term-by-term averages table
     st.markdown("**Term-by-Term Section Averages**")
+    rate_cols = ["dfw_rate", "drop_rate", "incomplete_rate", "repeat_rate"]
+    count_cols = {
+        "Official Class Enrollments": "Avg Enrollment",
+        "dfw_count": "Avg DFW Count",
+        "drop_count": "Avg Drop Count",
+        "incomplete_count": "Avg Incomplete Count",
+        "repeat_count": "Avg Repeat Count",
+    }
     term_display = ct[
         [
             "Term Description",
@@ -309,32 +329,18 @@ def render_course_drilldown(
             "repeat_count",
             "repeat_rate",
         ]
-    ].copy()
-    term_display = term_display.rename(columns={
-        "num_sections": "Sections",
-        "Official Class Enrollments": "Avg Enrollment",
-        "dfw_count": "Avg DFW Count",
-        "drop_count": "Avg Drop Count",
-        "incomplete_count": "Avg Incomplete Count",
-        "repeat_count": "Avg Repeat Count",
-    })
-    for col in ["dfw_rate", "drop_rate", "incomplete_rate", "repeat_rate"]:
-        term_display[col] = term_display[col].apply(
-            lambda x: f"{x:.1%}" if pd.notna(x) else "N/A"
-        )
-    for col in ["Avg Enrollment", "Avg DFW Count", "Avg Drop Count",
-                 "Avg Incomplete Count", "Avg Repeat Count"]:
-        term_display[col] = term_display[col].apply(lambda x: f"{x:.1f}")
+    ].rename(columns={"num_sections": "Sections", **count_cols}).assign(
+        **{col: _fmt_pct(ct[col]) for col in rate_cols},
+        **{name: _fmt_num(ct[col]) for col, name in count_cols.items()},
+    )
     st.dataframe(term_display, use_container_width=True, hide_index=True)
 
     # Section-level breakdown for a selected term
     st.divider()
     latest_term = ct.iloc[-1]["Term Description"]
+    course_sections = section_df[section_df["_course_key"] == course_key]
     section_terms = sorted(
-        section_df[
-            (section_df["Subject"] == subject)
-            & (section_df["Catalog Number"] == catalog)
-        ]["Term Description"].unique(),
+        course_sections["Term Description"].unique(),
         key=lambda t: term_order.get(t, 0),
     )
 
@@ -348,18 +354,20 @@ def render_course_drilldown(
             key="section_term_select",
         )
 
-        sections = section_df[
-            (section_df["Subject"] == subject)
-            & (section_df["Catalog Number"] == catalog)
-            & (section_df["Term Description"] == selected_term)
-        ].copy()
+        sections = course_sections[
+            course_sections["Term Description"] == selected_term
+        ]
 
         st.markdown(
             f"**Individual Sections for {selected_term}** "
             f"({len(sections)} sections)"
         )
 
-        section_display = sections[
+        # Highest DFW rate first, missing rates last
+        order = np.argsort(
+            -sections["dfw_rate"].fillna(-np.inf).to_numpy(), kind="stable"
+        )
+        section_display = sections.iloc[order][
             [
                 "Section Number",
                 "Official Class Enrollments",
@@ -370,12 +378,10 @@ def render_course_drilldown(
                 "incomplete_rate",
                 "repeat_rate",
             ]
-        ].copy()
-        section_display = section_display.sort_values("dfw_rate", ascending=False)
-        for col in ["dfw_rate", "drop_rate", "incomplete_rate", "repeat_rate"]:
-            section_display[col] = section_display[col].apply(
-                lambda x: f"{x:.1%}" if pd.notna(x) else "N/A"
-            )
+        ]
+        section_display = section_display.assign(
+            **{col: _fmt_pct(section_display[col]) for col in rate_cols}
+        )
         st.dataframe(section_display, use_container_width=True, hide_index=True)
 
 
@@ -388,6 +394,18 @@ def _render_trend_chart(
     """Render a plotly trend chart for course-level averages over terms."""
     show_secondary = st.checkbox("Show drop & incomplete rates", value=False)
 
+    chart_cols = ["Term Description", "dfw_rate", "num_sections"]
+    if show_secondary:
+        chart_cols += ["drop_rate", "incomplete_rate"]
+    fig = _build_trend_fig(ct[chart_cols], dfw_threshold, show_secondary)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _build_trend_fig(
+    ct: pd.DataFrame, dfw_threshold: float, show_secondary: bool
+) -> go.Figure:
+    """Build the trend figure; cached so unrelated reruns skip the rebuild."""
     fig = go.Figure()
 
     fig.add_trace(
@@ -453,8 +471,7 @@ def _render_trend_chart(
         legend=dict(orientation="h", yanchor="bottom", y=1.02),
         height=400,
     )
-
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 
 def render_exports(
@@ -469,25 +486,20 @@ def render_exports(
 
     with col1:
         if not flagged_df.empty:
-            export_flagged = flagged_df.copy()
-            export_flagged["reasons"] = export_flagged["reasons"].apply(
-                lambda r: "; ".join(r)
+            export_flagged = flagged_df.assign(
+                reasons=flagged_df["reasons"].str.join("; ")
             )
             st.download_button(
                 "Download Flagged Courses (CSV)",
-                export_flagged.to_csv(index=False),
+                _deferred_csv(export_flagged),
                 "flagged_courses.csv",
                 "text/csv",
             )
 
     with col2:
-        export_cols = [
-            c for c in course_term_df.columns
-            if c not in ("_term_order", "_order")
-        ]
         st.download_button(
             "Download Course-Term Averages (CSV)",
-            course_term_df[export_cols].to_csv(index=False),
+            _deferred_csv(course_term_df),
             "course_term_averages.csv",
             "text/csv",
         )
@@ -496,21 +508,32 @@ def render_exports(
         if selected_course:
             parts = selected_course.split(" ", 1)
             subject, catalog = parts[0], parts[1]
-            sec_data = section_df[
-                (section_df["Subject"] == subject)
-                & (section_df["Catalog Number"] == catalog)
-            ]
-            export_cols_sec = [
-                c for c in sec_data.columns if c not in ("_term_order", "_order")
-            ]
+            sec_data = section_df[section_df["_course_key"] == selected_course]
             st.download_button(
                 f"Download All Sections for {selected_course} (CSV)",
-                sec_data[export_cols_sec].to_csv(index=False),
+                _deferred_csv(sec_data),
                 f"sections_{subject}_{catalog}.csv",
                 "text/csv",
             )
 
 
+# Helper columns added for sorting and lookups; never exported
+_PRIVATE_COLUMNS = ("_term_order", "_order", "_course_key")
+
+
+def _deferred_csv(df: pd.DataFrame):
+    """Return a callable that serializes df to CSV when its button is clicked.
+
+    Given plain data, a download button would need the CSV on every rerun,
+    even when nobody clicks it.
+    """
+    def to_csv() -> str:
+        cols = [c for c in df.columns if c not in _PRIVATE_COLUMNS]
+        return df[cols].to_csv(index=False)
+
+    return to_csv
+
+
 def render_methodology():
     """Render an expandable section explaining how metrics are computed."""
     with st.expander("How metrics are computed"):